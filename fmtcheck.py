@@ -17,6 +17,10 @@ mistakes, and also to set and update the copyright statement
 #   (https://pypi.org/project/scandir)
 # * for Python < 3.4 it is required the "enum34" package
 #   (https://pypi.org/project/enum34)
+# * for Python < 3.2 it is required the "futures" package
+#   (https://pypi.org/project/futures) and the
+#   "backports.functools_lru_cache" package
+#   (https://pypi.org/project/backports.functools_lru_cache)
 # * the "argcomplete" package is strongly recommended for all Python versions
 #   (https://pypi.org/project/argcomplete)
 
@@ -24,17 +28,18 @@ import io
 import os
 import re
 import sys
-import copy
 import enum
+import mmap
 import stat
+import codecs
 import shutil
 import fnmatch
 import logging
 import argparse
-import datetime
 import functools
-import subprocess
+import itertools
 import collections
+import concurrent.futures
 
 try:
     import configparser
@@ -51,20 +56,22 @@ EX_FAILURE = 1
 EX_INTERRUPT = 130
 
 if not hasattr(os, 'scandir'):
-    from scandir import _scandir
+    from scandir import scandir as _scandir
     os.scandir = _scandir
     del _scandir
 
-try:
-    import argcomplete
-except ImportError:
-    argcomplete = False
+if not hasattr(functools, 'lru_cache'):
+    from backports.functools_lru_cache import lru_cache as _lru_cache
+    functools.lru_cache = _lru_cache
+    del _lru_cache
 
 
 __version__ = '1.5.0.dev0'
 PROG = 'fmtcheck'
 LOGFMT = '%(levelname)s: %(message)s'
 DEFAULT_CLANG_FORMAT = 'clang-format'
+MMAP_THRESHOLD = 4 * 1024 * 1024  # larger files are memory mapped
+VERBOSE = logging.INFO - 1
 
 
 class Eol(enum.Enum):
@@ -97,13 +104,76 @@ DEFAULT_CFG = ScanConfig(
 )
 
 
+def _read_bytes(path, mmap_threshold=None):
+    """Return the entire contents of path as bytes.
+
+    Use unbuffered low level I/O (os.open + os.read) sized on the actual
+    file size, in order to avoid the construction of file objects.
+
+    If mmap_threshold is not None, files larger than mmap_threshold bytes
+    are memory mapped (read-only) instead of being copied into memory.
+    In this case an mmap object is returned and it is responsibility
+    of the caller to release it (see _release_bytes).
+
+    """
+
+    fd = os.open(path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+    try:
+        size = os.fstat(fd).st_size
+        if mmap_threshold is not None and size > mmap_threshold:
+            data = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+            # @COMPATIBILITY: mmap.madvise is new in Python 3.8
+            if hasattr(mmap, 'MADV_WILLNEED'):
+                # start reading the entire file in background, checks
+                # scan it more times
+                data.madvise(mmap.MADV_WILLNEED)
+            return data
+
+        bufsize = max(size, io.DEFAULT_BUFFER_SIZE)
+        chunks = []
+        while True:
+            chunk = os.read(fd, bufsize)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    finally:
+        os.close(fd)
+
+    return b''.join(chunks)
+
+
+def _read_tail(path, size):
+    """Return the last size bytes of path (or less for smaller files)."""
+
+    fd = os.open(path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+    try:
+        offset = max(os.fstat(fd).st_size - size, 0)
+        os.lseek(fd, offset, os.SEEK_SET)
+        return os.read(fd, size)
+    finally:
+        os.close(fd)
+
+
+def _release_bytes(data):
+    """Release the resources associated to data returned by _read_bytes."""
+
+    if isinstance(data, mmap.mmap):
+        data.close()
+
+
 class SimpleDirEntry(object):
-    """Instantiable class with the same interface of os.DirEntry."""
+    """Instantiable class with the same interface of os.DirEntry.
 
-    __slots__ = ['_path']
+    As for os.DirEntry, stat results are cached on the first call.
+
+    """
+
+    __slots__ = ['_path', '_stat', '_lstat']
 
     def __init__(self, path):
         self._path = path
+        self._stat = None
+        self._lstat = None
 
     @property
     def name(self):
@@ -120,16 +190,20 @@ class SimpleDirEntry(object):
     def inode(self):
         """'Return inode of the entry."""
 
-        return os.stat(self._path).st_ino
+        return self.stat().st_ino
 
-    def is_dir(self):
+    def is_dir(self, follow_symlinks=True):
         """Return True if the entry is a directory."""
 
+        if not follow_symlinks and os.path.islink(self._path):
+            return False
         return os.path.isdir(self._path)
 
-    def is_file(self):
+    def is_file(self, follow_symlinks=True):
         """Return True if the entry is a file."""
 
+        if not follow_symlinks and os.path.islink(self._path):
+            return False
         return os.path.isfile(self._path)
 
     def is_symlink(self):
@@ -137,10 +211,17 @@ class SimpleDirEntry(object):
 
         return os.path.islink(self._path)
 
-    def stat(self):
+    def stat(self, follow_symlinks=True):
         """Return stat_result object for the entry."""
 
-        return os.stat(self._path)
+        if not follow_symlinks:
+            if self._lstat is None:
+                self._lstat = os.lstat(self._path)
+            return self._lstat
+
+        if self._stat is None:
+            self._stat = os.stat(self._path)
+        return self._stat
 
     def __fspath__(self):
         return os.fspath(self._path)
@@ -149,6 +230,123 @@ class SimpleDirEntry(object):
         return '<{} {!r}>'.format(self.__class__.__name__, self.name)
 
 
+def _glob_literals(pattern, maxsize=64):
+    """Return the list of literal strings matched by a glob pattern.
+
+    Only patterns without wildcards, possibly containing simple
+    character sets (e.g. "[ch]"), can be expanded.
+    None is returned for all other patterns.
+
+    """
+
+    literals = ['']
+    index = 0
+    while index < len(pattern):
+        char = pattern[index]
+        if char in '*?':
+            return None
+        elif char == '[':
+            end = pattern.find(']', index + 2)
+            charset = pattern[index + 1:end]
+            if end == -1 or charset[0] == '!' or set('-[\\').intersection(
+                    charset):
+                return None
+            literals = [item + c for item in literals for c in charset]
+            if len(literals) > maxsize:
+                return None
+            index = end + 1
+        else:
+            literals = [item + char for item in literals]
+            index += 1
+
+    return literals
+
+
+@functools.lru_cache(maxsize=32)
+def _get_name_matcher(patterns):
+    """Return a function that tests a name against a tuple of glob patterns.
+
+    Patterns in the form "*<literal>" or "<literal>*" (e.g. "*.txt",
+    "*.[ch]" or ".*") are tested using str.endswith and str.startswith
+    that are much faster than the regular expression engine.
+    Plain names (e.g. "Makefile") are looked up in a set.
+    Only the remaining patterns are translated into a regular expression.
+
+    Matchers are cached so that they are shared by SrcTree instances
+    using the same patterns.
+
+    """
+
+    suffixes = []
+    prefixes = []
+    names = set()
+    globs = []
+    for pattern in patterns:
+        literals = _glob_literals(pattern)
+        if literals is not None:
+            names.update(literals)
+            continue
+        elif pattern.startswith('*'):
+            literals = _glob_literals(pattern[1:])
+            if literals is not None:
+                suffixes.extend(literals)
+                continue
+        elif pattern.endswith('*'):
+            literals = _glob_literals(pattern[:-1])
+            if literals is not None:
+                prefixes.extend(literals)
+                continue
+        globs.append(pattern)
+
+    suffixes = tuple(suffixes)
+    prefixes = tuple(prefixes)
+    names = frozenset(names)
+
+    if globs:
+        match = re.compile('|'.join(fnmatch.translate(p) for p in globs)).match
+        if not suffixes and not prefixes and not names:
+            return match
+    else:
+        match = None
+
+    def matcher(name):
+        return (name in names or
+                name.endswith(suffixes) or name.startswith(prefixes) or
+                (match is not None and match(name) is not None))
+
+    return matcher
+
+
+@functools.lru_cache(maxsize=32)
+def _get_data_search(patterns):
+    """Return a function that tests if data contain any of patterns.
+
+    Patterns are regular expressions (str or bytes, like data).
+    If no pattern contains special characters, plain substring
+    searches are used instead of the regular expression engine.
+    Search functions are cached as for _get_name_matcher.
+
+    """
+
+    metachars, sep = '.^$*+?{}[]|()\\', '|'
+    if isinstance(patterns[0], bytes):
+        metachars, sep = metachars.encode('ascii'), b'|'
+
+    if any(c in metachars for pattern in patterns for c in pattern):
+        return re.compile(sep.join(patterns)).search
+
+    needles = tuple(patterns)
+
+    def search(data):
+        # str.find, bytes.find and mmap.find are all supported
+        for needle in needles:
+            if data.find(needle) != -1:
+                return True
+        return False
+
+    return search
+
+
 class SrcTree(object):
     """Tree object that provides smart iteration features."""
 
@@ -163,14 +361,21 @@ class SrcTree(object):
         self._skip_path_patterns = None
         self._skip_data_patterns = None
 
-        self._path_re = None
-        self._skip_path_re = None
-        self._skip_data_re = None
+        self._path_match = None
+        self._skip_path_match = None
+        self._skip_data_search = None
 
         self.path_patterns = path_patterns
         self.skip_path_patterns = skip_path_patterns
         self.skip_data_patterns = skip_data_patterns
 
+    def __reduce__(self):
+        # matchers are closures that cannot be pickled (e.g. to be sent to
+        # worker processes): rebuild them from patterns
+        args = (self.path, self.mode, self.path_patterns,
+                self.skip_path_patterns, self.skip_data_patterns)
+        return self.__class__, args
+
     @property
     def path_patterns(self):
         return self._path_patterns
@@ -178,11 +383,8 @@ class SrcTree(object):
     @path_patterns.setter
     def path_patterns(self, patterns):
         self._path_patterns = patterns
-        if patterns:
-            self._path_re = re.compile(
-                '|'.join(fnmatch.translate(p) for p in patterns))
-        else:
-            self._path_re = re.compile('.*')
+        # match anything if no pattern is specified
+        self._path_match = _get_name_matcher(tuple(patterns or ['*']))
 
     @property
     def skip_path_patterns(self):
@@ -191,14 +393,10 @@ class SrcTree(object):
     @skip_path_patterns.setter
     def skip_path_patterns(self, patterns):
         self._skip_path_patterns = patterns
-
         if patterns:
-            pattern = '|'.join(fnmatch.translate(p) for p in patterns)
+            self._skip_path_match = _get_name_matcher(tuple(patterns))
         else:
-            # does not match anything
-            pattern = '-^'
-
-        self._skip_path_re = re.compile(pattern)
+            self._skip_path_match = None
 
     @property
     def skip_data_patterns(self):
@@ -208,16 +406,15 @@ class SrcTree(object):
     def skip_data_patterns(self, patterns):
         self._skip_data_patterns = patterns
 
-        if patterns:
-            pattern = '|'.join(patterns)
-        else:
-            # does not match anything
-            pattern = '-^'
+        if not patterns:
+            # avoid a useless search on the data of each file
+            self._skip_data_search = None
+            return
 
         if self.mode == Mode.BINARY:
-            pattern = pattern.encode('ascii')
+            patterns = [pattern.encode('ascii') for pattern in patterns]
 
-        self._skip_data_re = re.compile(pattern)
+        self._skip_data_search = _get_data_search(tuple(patterns))
 
     @staticmethod
     def _scan(path):
@@ -227,41 +424,219 @@ class SrcTree(object):
             logging.debug('scanning %r', path)
             return os.scandir(path)
 
-    def __iter__(self):
-        for entry in self._scan(self.path):
-            if self._skip_path_re.match(entry.name):
-                logging.debug('skipping %r', entry.path)
-                continue
+    def _iter_entries(self):
+        # iterative depth-first walk: the stack holds one directory
+        # iterator per level, so that no object is created per sub-tree.
+        # Symbolic links to directories are followed: the real path of
+        # scanned directories is recorded to avoid loops.
+        realpath = os.path.realpath(self.path)
+        visited = set([realpath])
+        stack = [(iter(self._scan(self.path)), realpath)]
+        try:
+            while stack:
+                iterator, dirpath = stack[-1]
+                for entry in iterator:
+                    if (self._skip_path_match is not None and
+                            self._skip_path_match(entry.name)):
+                        logging.debug('skipping %r', entry.path)
+                        continue
+
+                    if entry.is_dir():
+                        if entry.is_symlink():
+                            realpath = os.path.realpath(entry.path)
+                        else:
+                            realpath = os.path.join(dirpath, entry.name)
+
+                        if realpath in visited:
+                            logging.debug(
+                                'skipping %r (already scanned)', entry.path)
+                            continue
+
+                        visited.add(realpath)
+                        logging.debug('scanning %r', entry.path)
+                        stack.append((os.scandir(entry.path), realpath))
+                        break
+                    elif self._path_match(entry.name):
+                        # skip FIFOs, devices, sockets and broken links
+                        # (os.DirEntry caches the file type)
+                        if entry.is_file():
+                            yield entry
+                        else:
+                            logging.debug('skipping %r', entry.path)
+                    else:
+                        logging.debug('skipping %r', entry.path)
+                else:
+                    stack.pop()
+        finally:
+            # release directory file descriptors on early exit
+            for iterator, _ in stack:
+                if hasattr(iterator, 'close'):
+                    iterator.close()
+
+    def _load(self, path, mmap_threshold=None):
+        """Return the contents of path or None if the file shall be skipped.
+
+        In binary mode, files larger than mmap_threshold are memory mapped
+        (see _read_bytes).
 
-            if entry.is_dir():
-                subtree = copy.copy(self)
-                subtree.path = entry.path
+        """
 
-                # @COMPATBILITY: "yeild form" is new in Python 3.3
-                # yield from subtree
-                for item in subtree:
-                    yield item
-            elif self._path_re.match(entry.name):
+        if self.mode == Mode.BINARY:
+            data = _read_bytes(path, mmap_threshold)
+        else:
+            try:
+                with open(path, str(self.mode.value)) as fd:
+                    data = fd.read()
+            except UnicodeDecodeError as ex:
+                logging.warning('unable to read %r: %s', path, ex)
+                return None
+
+        if (self._skip_data_search is not None and
+                self._skip_data_search(data)):
+            logging.debug('skipping %r', path)
+            _release_bytes(data)
+            return None
+
+        return data
+
+    def _iter_data(self, mmap_threshold=None):
+        # NOTE: memory mapped data are only valid until the iteration
+        # moves to the next entry
+        for entry in self._iter_entries():
+            data = self._load(entry.path, mmap_threshold)
+            if data is not None:
                 try:
-                    with open(entry.path, str(self.mode.value)) as fd:
-                        data = fd.read()
-                except UnicodeDecodeError as ex:
-                    logging.warning(
-                        'unable to read {!r}: {}'.format(entry.path, ex))
-                else:
-                    if self._skip_data_re.search(data):
-                        logging.debug('skipping %r', entry.path)
-                    else:
-                        yield entry, data
+                    yield entry, data
+                finally:
+                    _release_bytes(data)
+
+    def __iter__(self):
+        return self._iter_data()
 
-            else:
-                logging.debug('skipping %r', entry.path)
+
+def _prune_paths(paths, skip_path_patterns=()):
+    """Remove duplicate paths and paths included in the tree of other ones.
+
+    A path is removed if it refers to the same file or directory of
+    a previous one, or if it would be reached anyway by the scan of
+    another directory in paths (i.e. none of the intermediate directories,
+    nor the path itself, matches skip_path_patterns).
+    Paths that do not exist are always kept.
+
+    """
+
+    if skip_path_patterns:
+        skip_match = _get_name_matcher(tuple(skip_path_patterns))
+    else:
+        skip_match = None
+
+    realpaths = [
+        os.path.realpath(path) if os.path.exists(path) else None
+        for path in paths
+    ]
+    dirs = set(
+        realpath for realpath in realpaths
+        if realpath is not None and os.path.isdir(realpath))
+
+    def is_included(realpath):
+        head, tail = os.path.split(realpath)
+        while tail:
+            if skip_match is not None and skip_match(tail):
+                return False
+            if head in dirs:
+                return True
+            head, tail = os.path.split(head)
+        return False
+
+    pruned = []
+    seen = set()
+    for path, realpath in zip(paths, realpaths):
+        if realpath is None:
+            pruned.append(path)
+        elif realpath in seen:
+            logging.debug('skipping duplicate path %r', path)
+        elif is_included(realpath):
+            logging.debug('skipping %r (already included)', path)
+        else:
+            pruned.append(path)
+        seen.add(realpath)
+
+    return pruned
 
 
 def _isexecutable(mode):
     return bool(mode & (stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH))
 
 
+try:
+    _isascii = bytes.isascii
+except AttributeError:
+    # @COMPATIBILITY: bytes.isascii is new in Python 3.7
+    def _isascii(data, non_ascii_re=re.compile(b'[\x80-\xff]')):
+        return non_ascii_re.search(data) is None
+
+
+@functools.lru_cache(maxsize=8)
+def _is_ascii_compatible(encoding):
+    """Return True if ASCII data is decoded unchanged by encoding."""
+
+    data = bytes(range(128))
+    try:
+        return data.decode(encoding) == data.decode('ascii')
+    except UnicodeDecodeError:
+        return False
+
+
+def _search_end(data, pattern):
+    """Return the end index of the first occurrence of pattern in data.
+
+    The pattern can be either a compiled regular expression or a tuple
+    of plain byte strings, in which case the first occurrence of any of
+    them is searched using the (much faster) bytes.find method.
+    If no match is found -1 is returned.
+
+    """
+
+    if not isinstance(pattern, tuple):
+        mobj = pattern.search(data)
+        return -1 if mobj is None else mobj.end()
+
+    end = -1
+    first = len(data)
+    for needle in pattern:
+        # only look for occurrences preceding the first one already found
+        index = data.find(needle, 0, first + len(needle) - 1)
+        if index != -1:
+            first = index
+            end = index + len(needle)
+
+    return end
+
+
+@functools.lru_cache(maxsize=32)
+def _get_eol_patterns(eol_value):
+    """Return the (invalid EOL, trailing spaces) patterns for eol_value.
+
+    Patterns are suitable for the _search_end function and are cached
+    so that they are shared across scans and CheckTool instances using
+    the same EOL.
+
+    """
+
+    eol = eol_value.encode('ascii')
+
+    if eol_value == Eol.UNIX.value:
+        invalid_eol = (b'\r\n',)
+    elif eol_value == Eol.WIN.value:
+        invalid_eol = re.compile(b'(?<!\r)\n')
+    else:
+        raise ValueError('unexpected end of line: {!r}'.format(eol_value))
+
+    trailing_spaces = (b' ' + eol, b'\t' + eol)
+
+    return invalid_eol, trailing_spaces
+
+
 class CheckTool(object):
     """Check the conformity of source code to basic standards.
 
@@ -306,6 +681,7 @@ class CheckTool(object):
         self.maxlinelen = int(kwargs.pop('maxlinelen', 0))
         self.eol = Eol(kwargs.pop('eol', Eol.NATIVE))
         self.encoding = kwargs.pop('encoding', 'ascii')
+        self.jobs = int(kwargs.pop('jobs', 1))
 
         if kwargs:
             key = next(iter(kwargs.keys()))
@@ -313,97 +689,173 @@ class CheckTool(object):
                 '__init__() got an unexpected keyword argument '
                 '{!r}'.format(key))
 
-        self._checklist = collections.OrderedDict()
+        self._checklist = ()
+        self._checklist_key = None
         self._current_filename = None
 
-    def _tab_checker(self, data, tab_re=re.compile(b'\t')):
-        mobj = tab_re.search(data)
-        if mobj is not None:
-            lines = data[:mobj.end()].splitlines()
-            logging.log(
-                logging.getLevelName('VERBOSE'),
-                '%s:%d: %r -- tab character (first occurrence)',
-                self._current_filename, len(lines), lines[-1].decode('utf-8'))
-        return mobj is not None
-
-    def _invalid_eol_checker(self, data, invalid_eol_re=None):
-        if invalid_eol_re is None:
-            if self.eol.value == Eol.UNIX.value:
-                invalid_eol_re = re.compile(b'\r\n')
-            elif self.eol.value == Eol.WIN.value:
-                invalid_eol_re = re.compile(b'(?<!\r)\n')
+    def __getstate__(self):
+        # checkers are bound methods (that cannot be pickled in Python 2):
+        # the checklist is rebuilt when the tool is unpickled
+        state = self.__dict__.copy()
+        state['_checklist'] = ()
+        state['_checklist_key'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._update_checklist()
+
+    def _log_first_occurrence(self, data, end, msg):
+        if not logging.getLogger().isEnabledFor(VERBOSE):
+            return
+
+        lines = data[:end].splitlines()
+        logging.log(
+            VERBOSE,
+            '%s:%d: %r -- %s (first occurrence)',
+            self._current_filename, len(lines),
+            lines[-1].decode('utf-8', 'replace'), msg)
+
+    def _tab_checker(self, data):
+        end = _search_end(data, (b'\t',))
+        if end != -1:
+            self._log_first_occurrence(data, end, 'tab character')
+        return end != -1
+
+    def _invalid_eol_checker(self, data, invalid_eol=None):
+        if invalid_eol is None:
+            invalid_eol, _ = _get_eol_patterns(self.eol.value)
+
+        end = _search_end(data, invalid_eol)
+        if end != -1:
+            self._log_first_occurrence(data, end, 'invalid EOL')
+        return end != -1
+
+    def _trailing_checker(self, data, trailing_spaces=None):
+        if trailing_spaces is None:
+            _, trailing_spaces = _get_eol_patterns(self.eol.value)
+
+        end = _search_end(data, trailing_spaces)
+        if end != -1:
+            self._log_first_occurrence(data, end, 'trailing spaces')
+        return end != -1
+
+    def _ascii_checker(self, data, non_ascii_re=re.compile(b'[\x80-\xff]'),
+                       eol_re=re.compile(b'[\r\n]|$')):
+        if isinstance(data, bytes) and _isascii(data):
+            return False
+
+        mobj = non_ascii_re.search(data)
+        if mobj is None:
+            return False
+
+        if not logging.getLogger().isEnabledFor(VERBOSE):
+            return True
+
+        index = mobj.start()
+        lines = data[:index + 1].splitlines()
+        line = lines[-1] + data[index + 1:eol_re.search(data, index).start()]
+        logging.log(
+            VERBOSE,
+            '%s:%d: %r -- unable to decode',
+            self._current_filename, len(lines), line)
+        return True
+
+    def _encoding_checker(self, data, non_ascii_re=re.compile(b'[\x80-\xff]')):
+        ascii_compatible = _is_ascii_compatible(self.encoding)
+
+        # pure ASCII data do not need to be decoded line by line
+        if ascii_compatible and (
+                _isascii(data) if isinstance(data, bytes)
+                else non_ascii_re.search(data) is None):
+            return False
+
+        if not isinstance(data, bytes):
+            data = data[:]  # e.g. mmap
+
+        if ascii_compatible:
+            # EOL bytes are never part of multi-byte sequences, so the
+            # entire buffer can be decoded at once: lines are only split
+            # to locate the first error
+            try:
+                data.decode(self.encoding)
+            except UnicodeDecodeError:
+                if not logging.getLogger().isEnabledFor(VERBOSE):
+                    return True
             else:
-                raise ValueError(
-                    'unexpected end of line: {!r}'.format(self.eol))
-
-        mobj = invalid_eol_re.search(data)
-        if mobj is not None:
-            lines = data[:mobj.end()].splitlines()
-            logging.log(
-                logging.getLevelName('VERBOSE'),
-                '%s:%d: %r -- invalid EOL (first occurrence)',
-                self._current_filename, len(lines), lines[-1].decode('utf-8'))
-        return mobj is not None
-
-    def _trailing_checker(self, data, trailing_spaces_re=None):
-        if trailing_spaces_re is None:
-            trailing_spaces_re = re.compile(
-                    b'[ \t]' + self.eol.value.encode('ascii'))
-
-        mobj = trailing_spaces_re.search(data)
-        if mobj is not None:
-            lines = data[:mobj.end()].splitlines()
-            logging.log(
-                logging.getLevelName('VERBOSE'),
-                '%s:%d: %r -- trailing spaces (first occurrence)',
-                self._current_filename, len(lines), lines[-1].decode('utf-8'))
-        return mobj is not None
-
-    def _encoding_checker(self, data):
+                return False
+
         for lineno, line in enumerate(data.splitlines(), 1):
             try:
                 line.decode(self.encoding)
             except UnicodeDecodeError:
                 logging.log(
-                    logging.getLevelName('VERBOSE'),
+                    VERBOSE,
                     '%s:%d: %r -- unable to decode',
                     self._current_filename, lineno, line)
                 return True
 
-    def _linelen_checker(self, data):
-        if self.eol is None:
+    def _linelen_checker(self, data, eol=None):
+        if not isinstance(data, bytes):
+            data = data[:]  # e.g. mmap
+
+        if eol is None and self.eol is not None:
+            eol = self.eol.value.encode('ascii')
+
+        if eol is None:
             line_iterator = data.splitlines()
         else:
-            line_iterator = data.split(self.eol.value.encode('ascii'))
+            line_iterator = data.split(eol)
 
         for lineno, line in enumerate(line_iterator, 1):
             if len(line) > self.maxlinelen:
-                logging.log(
-                    logging.getLevelName('VERBOSE'),
-                    '%s:%d: %r -- line too long (%d characters)',
-                    self._current_filename, lineno, line.decode('utf-8'),
-                    len(line))
+                if logging.getLogger().isEnabledFor(VERBOSE):
+                    logging.log(
+                        VERBOSE,
+                        '%s:%d: %r -- line too long (%d characters)',
+                        self._current_filename, lineno,
+                        line.decode('utf-8', 'replace'), len(line))
                 return True
 
     @staticmethod
-    def _eol_at_eof_checker(data):
-        last_eol_index = data.rfind(b'\n')
-        if last_eol_index == -1 or data[last_eol_index:].strip() != b'':
-            return True
+    def _eol_at_eof_checker(data, blanks=b' \t\r\x0b\x0c'):
+        # only inspect the trailing blanks: no slice of data is created
+        end = len(data)
+        while end > 0 and data[end - 1] in blanks:
+            end -= 1
+        return end == 0 or data[end - 1:end] != b'\n'
 
     def _relative_include_checker(self, data):
-        return self.RELATIVE_INCLUDE_RE.search(data) is not None
+        # most files have no include directive at all: skip the regex
+        pos = data.find(b'#include')
+        if pos == -1:
+            return False
+        pos = data.rfind(b'\n', 0, pos) + 1
+        return self.RELATIVE_INCLUDE_RE.search(data, pos) is not None
 
     def _copyright_checker(self, data):
-        return self.COPYRIGHT_RE.search(data) is None
+        # locate the literal part of the statement first (memmem is much
+        # faster than the regex engine), then match the entire pattern
+        pos = data.find(b'opyright')
+        if pos == -1:
+            return True
+        return self.COPYRIGHT_RE.search(data, max(pos - 1, 0)) is None
 
     @staticmethod
     def _mode_checker(direntry):
+        # NOTE: symbolic links are followed, the mode of a link itself is
+        # always 0777. SrcTree only uses the file type reported by scandir,
+        # so this is the only stat call performed for each checked file
         return _isexecutable(direntry.stat().st_mode)
 
     def _clang_format_checker(self, direntry, data):
         # assert(self.CXX_PATH_RE.match(direntry.name))
 
+        import subprocess
+
+        if not isinstance(data, bytes):
+            data = data[:]  # e.g. mmap
+
         cmd = [
             self.clang_format,
             '-assume-filename={}'.format(direntry.path),
@@ -421,7 +873,7 @@ class CheckTool(object):
             return True
 
         if completed_process.stdout != data:
-            if logging.getLogger().level <= logging.DEBUG:
+            if logging.getLogger().isEnabledFor(logging.DEBUG):
                 # format diff
 
                 import difflib
@@ -440,73 +892,94 @@ class CheckTool(object):
             return True
 
     def _get_checklist(self):
-        checklist = collections.OrderedDict()
+        # NOTE: byte level checks (tabs, EOL, trailing spaces) are
+        # intentionally performed in separate passes: with the "re" module
+        # a single alternation regex is several times slower than
+        # independent searches for simple patterns.
+        checklist = []
+
+        if self.check_eol or self.check_trailing:
+            invalid_eol, trailing_spaces = _get_eol_patterns(self.eol.value)
 
         if self.check_tabs:
-            checklist['tabs'] = self._tab_checker
+            checklist.append(('tabs', self._tab_checker))
 
         if self.check_eol:
-            if self.eol.value == Eol.UNIX.value:
-                invalid_eol_re = re.compile(b'\r\n')
-            elif self.eol.value == Eol.WIN.value:
-                invalid_eol_re = re.compile(b'(?<!\r)\n')
-            else:
-                raise ValueError(
-                    'unexpected end of line: {!r}'.format(self.eol))
-
-            checklist['invalid EOL'] = functools.partial(
-                self._invalid_eol_checker, invalid_eol_re=invalid_eol_re)
+            checklist.append(('invalid EOL', functools.partial(
+                self._invalid_eol_checker, invalid_eol=invalid_eol)))
 
         if self.check_trailing:
-            trailing_spaces_re = re.compile(
-                b'[ \t]' + self.eol.value.encode('ascii'))
-            checklist['trailing spaces'] = functools.partial(
-                self._trailing_checker, trailing_spaces_re=trailing_spaces_re)
+            checklist.append(('trailing spaces', functools.partial(
+                self._trailing_checker, trailing_spaces=trailing_spaces)))
 
         if self.check_encoding:
             key = 'not {}'.format(self.encoding)
-            checklist[key] = self._encoding_checker
+            if codecs.lookup(self.encoding).name == 'ascii':
+                checklist.append((key, self._ascii_checker))
+            else:
+                checklist.append((key, self._encoding_checker))
 
         if self.check_eol_at_eof:
-            checklist['no eol at eof'] = self._eol_at_eof_checker
+            checklist.append(('no eol at eof', self._eol_at_eof_checker))
 
         if self.check_relative_include:
-            checklist['relative include'] = self._relative_include_checker
+            checklist.append(
+                ('relative include', self._relative_include_checker))
 
         if self.check_copyright:
-            checklist['no copyright'] = self._copyright_checker
+            checklist.append(('no copyright', self._copyright_checker))
 
         if self.maxlinelen:
-            checklist['line tool long'] = self._linelen_checker
-
-        return checklist
+            if self.eol is None:
+                checker = self._linelen_checker
+            else:
+                checker = functools.partial(
+                    self._linelen_checker,
+                    eol=self.eol.value.encode('ascii'))
+            checklist.append(('line tool long', checker))
+
+        return tuple(checklist)
+
+    def _update_checklist(self):
+        # ensure to be in sync with the current status of flags, the
+        # checklist is only rebuilt if some of them has been changed
+        key = (
+            self.check_tabs, self.check_eol, self.check_trailing,
+            self.check_encoding, self.check_eol_at_eof,
+            self.check_relative_include, self.check_copyright,
+            self.maxlinelen, self.eol, self.encoding,
+        )
+        if key != self._checklist_key:
+            self._checklist = self._get_checklist()
+            self._checklist_key = key
 
     def _check_file_core(self, direntry, data):
         self._current_filename = direntry.path
         try:
             logging.debug('checking %r', self._current_filename)
 
-            stats = collections.Counter()
+            # each check fails at most once per file
+            stats = {}
 
-            for key, checkfunc in self._checklist.items():
+            for key, checkfunc in self._checklist:
                 if checkfunc(data):
-                    stats[key] += 1
-                    logging.info('{}: {}'.format(self._current_filename, key))
+                    stats[key] = 1
+                    logging.info('%s: %s', self._current_filename, key)
                     if self.failfast:
                         return stats
 
             if self.check_mode and self._mode_checker(direntry):
                 key = 'mode (executable bit)'
-                stats[key] += 1
-                logging.info('{}: {}'.format(self._current_filename, key))
+                stats[key] = 1
+                logging.info('%s: %s', self._current_filename, key)
                 if self.failfast:
                     return stats
 
             if self.clang_format and self.CXX_PATH_RE.match(direntry.name):
                 if self._clang_format_checker(direntry, data):
                     key = 'clang-format'
-                    stats[key] += 1
-                    logging.info('{}: {}'.format(self._current_filename, key))
+                    stats[key] = 1
+                    logging.info('%s: %s', self._current_filename, key)
                     if self.failfast:
                         return stats
 
@@ -517,36 +990,139 @@ class CheckTool(object):
     def check_file(self, filename):
         """Perform checks on the specified file."""
 
-        # ensure to be in sync with the current status of flags
-        self._checklist = self._get_checklist()
+        self._update_checklist()
 
-        with open(filename, 'rb') as fd:
-            data = fd.read()
+        data = None
+        if (not self.clang_format and
+                [key for key, _ in self._checklist] == ['no eol at eof']):
+            # only the end of the file is needed, unless it is made of
+            # blanks only (the last non blank byte is before the tail)
+            size = io.DEFAULT_BUFFER_SIZE
+            data = _read_tail(filename, size)
+            if len(data) == size and not data.rstrip(b' \t\r\x0b\x0c'):
+                data = None
+
+        if data is None:
+            data = _read_bytes(filename, MMAP_THRESHOLD)
 
-        return self._check_file_core(SimpleDirEntry(filename), data)
+        try:
+            stats = self._check_file_core(SimpleDirEntry(filename), data)
+        finally:
+            _release_bytes(data)
+
+        return collections.Counter(stats)
 
     def scan(self, path='.'):
         """Perform checks on all source files in path."""
 
-        # ensure to be in sync with the current status of flags
-        self._checklist = self._get_checklist()
+        return self.scan_paths([path])
 
-        stats = collections.Counter()
+    def scan_paths(self, paths):
+        """Perform checks on all source files in the specified paths.
 
-        srctree = SrcTree(
-            path, mode=Mode.BINARY,
-            path_patterns=self.scancfg.path_patterns,
-            skip_path_patterns=self.scancfg.skip_path_patterns,
-            skip_data_patterns=self.scancfg.skip_data_patterns)
+        Statistics of all paths are accumulated in a single Counter.
 
-        for direntry, data in srctree:
+        """
+
+        self._update_checklist()
+
+        srctrees = [
+            SrcTree(
+                path, mode=Mode.BINARY,
+                path_patterns=self.scancfg.path_patterns,
+                skip_path_patterns=self.scancfg.skip_path_patterns,
+                skip_data_patterns=self.scancfg.skip_data_patterns)
+            for path in paths
+        ]
+
+        if self.jobs != 1:
+            return self._parallel_scan(srctrees)
+
+        stats = {}
+        for direntry, data in itertools.chain.from_iterable(
+                srctree._iter_data(MMAP_THRESHOLD) for srctree in srctrees):
             local_stats = self._check_file_core(direntry, data)
-            stats.update(local_stats)
+            if local_stats:
+                for key, value in local_stats.items():
+                    stats[key] = stats.get(key, 0) + value
 
-            if self.failfast and stats:
-                break
+                if self.failfast:
+                    break
+
+        return collections.Counter(stats)
+
+    def _parallel_scan(self, srctrees):
+        # a single pool of workers is used for all trees: files are only
+        # loaded by workers, and loading does not depend on the root path
+        stats = {}
+
+        paths = [
+            entry.path for srctree in srctrees
+            for entry in srctree._iter_entries()
+        ]
+        if not paths:
+            return collections.Counter()
+
+        initargs = (self, srctrees[0], logging.getLogger().level)
+
+        # @COMPATIBILITY: initializer and initargs are new in Python 3.7,
+        # on older versions they are sent along with each chunk of paths
+        if sys.version_info >= (3, 7):
+            kwargs = dict(initializer=_init_check_worker, initargs=initargs)
+            worker = _check_worker
+        else:
+            kwargs = {}
+            worker = functools.partial(_check_worker, initargs=initargs)
+
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.jobs if self.jobs > 0 else None,
+                **kwargs) as executor:
+            results = executor.map(worker, paths, chunksize=32)
+            for local_stats in results:
+                if not local_stats:
+                    continue
+
+                for key, value in local_stats.items():
+                    stats[key] = stats.get(key, 0) + value
+
+                if self.failfast:
+                    # closing the iterator cancels the pending chunks of
+                    # paths, the pool is then shut down by the with block
+                    results.close()
+                    break
+
+        return collections.Counter(stats)
+
+
+_worker_tool = None
+_worker_srctree = None
 
-        return stats
+
+def _init_check_worker(tool, srctree, loglevel):
+    global _worker_tool, _worker_srctree
+
+    _worker_tool = tool
+    _worker_srctree = srctree
+
+    # logging is not configured in spawned processes
+    logging.addLevelName(VERBOSE, 'VERBOSE')
+    if not logging.getLogger().handlers:
+        logging.basicConfig(format=LOGFMT, stream=sys.stdout)
+    logging.getLogger().setLevel(loglevel)
+
+
+def _check_worker(path, initargs=None):
+    if initargs is not None and _worker_tool is None:
+        _init_check_worker(*initargs)
+
+    data = _worker_srctree._load(path, MMAP_THRESHOLD)
+    if data is None:
+        return {}
+
+    try:
+        return _worker_tool._check_file_core(SimpleDirEntry(path), data)
+    finally:
+        _release_bytes(data)
 
 
 class FixTool(object):
@@ -561,7 +1137,7 @@ class FixTool(object):
 
     """
 
-    TRIM_RE = re.compile('[ \t]+(?=\n)|[ \t]+$')
+    TRIM_RE = re.compile('[ \t]+$', re.MULTILINE)
     CXX_PATH_RE = CheckTool.CXX_PATH_RE
 
     def __init__(self, tabsize=4, fix_trailing=True, fix_eof=True,
@@ -578,23 +1154,33 @@ class FixTool(object):
 
         self.scancfg = scancfg
 
-        self._line_fixers = ()
+        self._fixers = ()
+        self._fixers_key = None
 
-    def _get_line_fixers(self):
-        line_fixers = []
+    def _get_fixers(self):
+        # all fixers are applied to the entire file contents at once
+        fixers = []
 
         if self.fix_trailing:
-            line_fixers.append(
-                lambda line: self.TRIM_RE.sub('', line)
+            trim = self.TRIM_RE.sub
+            fixers.append(
+                lambda data: trim('', data)
             )
 
         if self.tabsize:
             blanks = ' ' * self.tabsize
-            line_fixers.append(
-                lambda line: line.replace('\t', blanks)
+            fixers.append(
+                lambda data: data.replace('\t', blanks)
             )
 
-        return line_fixers
+        return fixers
+
+    def _update_fixers(self):
+        # ensure to be in sync with the current status of flags
+        key = (self.fix_trailing, self.tabsize)
+        if key != self._fixers_key:
+            self._fixers = self._get_fixers()
+            self._fixers_key = key
 
     @staticmethod
     def _eof_fixer(data):
@@ -610,6 +1196,8 @@ class FixTool(object):
     def _clang_format_fixer(self, direntry, data):
         # assert(self.CXX_PATH_RE.match(direntry.name))
 
+        import subprocess
+
         cmd = [
             self.clang_format,
             '-assume-filename={}'.format(direntry.path),
@@ -633,14 +1221,8 @@ class FixTool(object):
         if self.fix_eof:
             data = self._eof_fixer(data)
 
-        istream = io.StringIO(data)
-        ostream = io.StringIO()
-        for line in istream:
-            for line_fixer in self._line_fixers:
-                line = line_fixer(line)
-            ostream.write(line)
-
-        data = ostream.getvalue()
+        for fixer in self._fixers:
+            data = fixer(data)
 
         if self.clang_format and self.CXX_PATH_RE.match(direntry.name):
             data = self._clang_format_fixer(direntry, data)
@@ -654,8 +1236,7 @@ class FixTool(object):
     def fix_file(self, filename, outfile=None):
         """Apply specified fixes on the input data."""
 
-        # ensure to be in sync with the current status of flags
-        self._line_fixers = self._get_line_fixers()
+        self._update_fixers()
 
         with open(filename, 'rb') as fd:
             data = fd.read()
@@ -672,8 +1253,7 @@ class FixTool(object):
     def scan(self, path='.'):
         """Apply fixes to all source files in path."""
 
-        # ensure to be in sync with the current status of flags
-        self._line_fixers = self._get_line_fixers()
+        self._update_fixers()
 
         srctree = SrcTree(
             path, mode=Mode.TEXT,
@@ -691,6 +1271,12 @@ class FixTool(object):
             self._fix_file_core(direntry, data)
 
 
+@functools.lru_cache(maxsize=8)
+def _get_copyright_re(template, year):
+    # NOTE: use the % formatting notation
+    return re.compile(template % dict(year=year))
+
+
 class CopyrightTool(object):
     """Update or add the copyright statement is source files.
 
@@ -714,6 +1300,7 @@ class CopyrightTool(object):
     def __init__(self, copyright_template_path=None, update=True, year=None,
                  backup_ext=None, scancfg=DEFAULT_CFG):
         if year is None:
+            import datetime
             year = datetime.date.today().year
 
         self.copyright_template_path = copyright_template_path
@@ -725,9 +1312,10 @@ class CopyrightTool(object):
         self.scancfg = scancfg
 
         # NOTE: use the % formatting notation
-        values = dict(year=year)
-        self._copyright_re = re.compile(self.COPYRIGHT_RE_TEMPLATE % values)
-        self._repl_copyright_re = self.REPL_COPYRIGHT_RE_TEMPLATE % values
+        self._copyright_re = _get_copyright_re(
+            self.COPYRIGHT_RE_TEMPLATE, year)
+        self._repl_copyright_re = self.REPL_COPYRIGHT_RE_TEMPLATE % dict(
+            year=year)
         self._check_copyright_re = re.compile(self.CHECK_COPYRIGHT_RE)
 
     def _load_copyright_template(self):
@@ -746,11 +1334,14 @@ class CopyrightTool(object):
         if self.update:
             data = self._copyright_re.sub(self._repl_copyright_re, data)
 
+        header = None
         if (self._copyright_template_str is not None and
                 not self._check_copyright_re.search(data)):
-            data = self._copyright_template_str + data
+            header = self._copyright_template_str
 
         with open(filename, 'w') as fd:
+            if header:
+                fd.write(header)
             fd.write(data)
 
     def update_copyright(self, filename, outfile=None):
@@ -839,6 +1430,7 @@ class ConfigParser(configparser.ConfigParser):
         d['maxlinelen'] = int(tool.maxlinelen)
         d['eol'] = tool.eol.name
         d['encoding'] = tool.encoding
+        d['jobs'] = int(tool.jobs)
 
         return d
 
@@ -949,6 +1541,12 @@ class ConfigParser(configparser.ConfigParser):
         if 'encoding' in section:
             d['encoding'] = self.get(sectname, 'encoding')
 
+        if 'jobs' in section:
+            jobs = self.getint(sectname, 'jobs')
+            if jobs < 0:
+                raise ValueError('invalid number of jobs: {}'.format(jobs))
+            d['jobs'] = jobs
+
         loglevel = self._get_loglevel()
         if loglevel is not None:
             d['loglevel'] = loglevel
@@ -1031,6 +1629,20 @@ class ConfigParser(configparser.ConfigParser):
             raise ValueError('unexpected command: {!r}'.format(command))
 
 
+def _non_negative_int(value):
+    """Convert the value of a command line option to a non negative int."""
+
+    try:
+        result = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            'not an integer: {!r}'.format(value))
+    if result < 0:
+        raise argparse.ArgumentTypeError(
+            'invalid non negative int value: {!r}'.format(value))
+    return result
+
+
 def _summary_line(s):
     return s.split('\n\n', 1)[0]
 
@@ -1171,6 +1783,10 @@ def get_check_parser(parser=None):
     parser.add_argument(
         '-f', '--failfast', action='store_true', default=False,
         help='exit immediately as soon as a check fails')
+    parser.add_argument(
+        '-j', '--jobs', type=_non_negative_int, default=1,
+        help='''number of worker processes used to check files in parallel,
+        0 means the number of available CPUs (default: %(default)d)''')
 
     parser = _set_common_perser_args(parser)
 
@@ -1234,6 +1850,8 @@ def get_update_copyright_parser(parser=None):
             description=CopyrightTool.__doc__,
             help=_summary_line(CopyrightTool.__doc__))
 
+    import datetime
+
     parser.add_argument(
         '-t', '--template', dest='copyright_template_path',
         help='''copyright statement template file.
@@ -1289,8 +1907,33 @@ def get_dumpcfg_parser(parser=None):
     return parser
 
 
-def get_parser():
-    """Instantiate the command line argument parser."""
+# @COMPATIBILITY: dict preserves the insertion order only in Python >= 3.7
+_SUBPARSER_BUILDERS = collections.OrderedDict([
+    ('check', get_check_parser),
+    ('fix', get_fix_parser),
+    ('update-copyright', get_update_copyright_parser),
+    ('dumpcfg', get_dumpcfg_parser),
+])
+
+
+def _get_command(argv):
+    """Return the sub-command in argv (None if not found)."""
+
+    if argv and argv[0] in _SUBPARSER_BUILDERS:
+        # only --help and --version can precede the sub-command
+        return argv[0]
+
+    return None
+
+
+def get_parser(command=None):
+    """Instantiate the command line argument parser.
+
+    If command is specified only the parser for the specified sub-command
+    is built, otherwise all sub-command parsers are built (e.g. to print
+    the complete help message).
+
+    """
 
     parser = argparse.ArgumentParser(
         description=__doc__, prog=PROG,
@@ -1302,39 +1945,65 @@ def get_parser():
     # Sub-command management
     subparsers = parser.add_subparsers(dest='command', title='sub-commands')
 
-    get_check_parser(subparsers)
-    get_fix_parser(subparsers)
-    get_update_copyright_parser(subparsers)
-    get_dumpcfg_parser(subparsers)
+    if command is not None:
+        _SUBPARSER_BUILDERS[command](subparsers)
+    else:
+        for get_subparser in _SUBPARSER_BUILDERS.values():
+            get_subparser(subparsers)
 
-    if argcomplete:
-        argcomplete.autocomplete(parser)
+    # argcomplete is only imported when the shell requests completions
+    if '_ARGCOMPLETE' in os.environ:
+        try:
+            import argcomplete
+        except ImportError:
+            pass
+        else:
+            argcomplete.autocomplete(parser)
 
     return parser
 
 
+@functools.lru_cache(maxsize=None)
+def _get_cached_parser(command=None):
+    # parsers are not modified by parse_args, so they can be reused by
+    # subsequent calls (e.g. when main is called more times in process)
+    return get_parser(command)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_cached_command_parser(command):
+    # stand-alone parser for a single sub-command
+    return _SUBPARSER_BUILDERS[command]()
+
+
 def parse_args(args=None, namespace=None, parser=None):
     """Parse command line arguments."""
 
+    argv = sys.argv[1:] if args is None else list(args)
+
     if parser is None:
-        parser = get_parser()
+        command = None
+        if '_ARGCOMPLETE' not in os.environ:
+            # the complete parser is needed for shell completion
+            command = _get_command(argv)
+        parser = _get_cached_parser(command)
 
     # passing a napespace here doesn't work due to Python issue #29670
     # (https://bugs.python.org/issue29670)
-    # args = parser.parse_args(args, namespace)
-    args = parser.parse_args(args, namespace=None)
+    # args = parser.parse_args(argv, namespace)
+    args = parser.parse_args(argv, namespace=None)
 
     if args.command is None:
         parser.error('command not specified')
 
     if namespace is not None:
+        # re-parse the same arguments with the stand-alone sub-command
+        # parser, so that values in namespace are used as defaults
         command = args.command
-        name = 'get_{}_parser'.format(command.replace('-', '_'))
-        get_parser_func = globals()[name]
-        parser = get_parser_func()
+        parser = _get_cached_command_parser(command)
 
-        argv = sys.argv[1:]
-        argv.remove(command)
+        # only --help and --version (that exit) can precede the command
+        argv = argv[argv.index(command) + 1:]
         args = parser.parse_args(argv, namespace)
         args.command = command
 
@@ -1344,11 +2013,112 @@ def parse_args(args=None, namespace=None, parser=None):
     return args
 
 
+def _split_patterns(value):
+    """Split a comma separated list of patterns removing duplicates."""
+
+    # @COMPATIBILITY: dict preserves the insertion order only in Python >= 3.7
+    return list(collections.OrderedDict.fromkeys(value.split(',')))
+
+
+def _get_clang_format(args):
+    if getattr(args, 'clang_format', None) in (None, False, 'False'):
+        return False
+
+    clang_format = args.clang_format
+    if clang_format is True:
+        clang_format = DEFAULT_CLANG_FORMAT
+
+    # resolve the executable once instead of searching PATH at each run
+    # @COMPATIBILITY: shutil.which is new in Python 3.3
+    if hasattr(shutil, 'which'):
+        clang_format = shutil.which(clang_format) or clang_format
+
+    import subprocess
+
+    completed_process = subprocess.run(
+        [clang_format, '--version'], check=True, stdout=subprocess.PIPE)
+    logging.debug(completed_process.stdout.decode(sys.getdefaultencoding()))
+
+    return clang_format
+
+
+def _do_check(args, scancfg):
+    tool = CheckTool(
+        check_tabs=args.check_tabs,
+        check_eol=args.check_eol,
+        check_trailing=args.check_trailing,
+        check_encoding=args.check_encoding,
+        check_eol_at_eof=args.check_eol_at_eof,
+        check_relative_include=args.check_relative_include,
+        check_copyright=args.check_copyright,
+        check_mode=args.check_mode,
+        clang_format=_get_clang_format(args),
+        maxlinelen=args.maxlinelen,
+        jobs=args.jobs,
+        failfast=args.failfast,
+        scancfg=scancfg,
+    )
+
+    stats = tool.scan_paths(
+        _prune_paths(args.paths, scancfg.skip_path_patterns))
+
+    if stats:
+        msg = '\n'.join('%7d: %s' % (v, k) for k, v in stats.most_common())
+        logging.warning('check failed\n' + msg)
+    else:
+        logging.info('check completed successfully')
+
+    return bool(stats)
+
+
+def _do_fix(args, scancfg):
+    tool = FixTool(
+        tabsize=args.tabsize,
+        fix_trailing=args.fix_trailing,
+        fix_eof=args.fix_eof,
+        fix_mode=args.fix_mode,
+        clang_format=_get_clang_format(args),
+        eol=args.eol,
+        backup_ext=args.backup,
+        scancfg=scancfg,
+    )
+    for path in _prune_paths(args.paths, scancfg.skip_path_patterns):
+        tool.scan(path)
+
+
+def _do_update_copyright(args, scancfg):
+    tool = CopyrightTool(
+        copyright_template_path=args.copyright_template_path,
+        update=args.update,
+        year=args.year,
+        backup_ext=args.backup,
+        scancfg=scancfg,
+    )
+    for path in _prune_paths(args.paths, scancfg.skip_path_patterns):
+        tool.scan(path)
+
+
+def _do_dumpcfg(args, scancfg):
+    cfg = ConfigParser()
+    cfg.setup_default_config()
+    out = io.StringIO()
+    cfg.write(out)
+    print(out.getvalue())
+
+
+_COMMANDS = {
+    'check': _do_check,
+    'fix': _do_fix,
+    'update-copyright': _do_update_copyright,
+    'dumpcfg': _do_dumpcfg,
+}
+
+
 def main(*argv):
     """Main CLI interface."""
 
     # setup logging
-    logging.addLevelName(logging.INFO - 1, 'VERBOSE')
+    logging.addLevelName(VERBOSE, 'VERBOSE')
     logging.basicConfig(format=LOGFMT, level=logging.INFO, stream=sys.stdout)
     logging.captureWarnings(True)
 
@@ -1373,11 +2143,11 @@ def main(*argv):
             # re-parse
             kwargs = cfg.get_command_args(args.command)
             namespace = argparse.Namespace(**kwargs)
-            args = parse_args(namespace=namespace)
+            args = parse_args(argv if argv else None, namespace=namespace)
             logging.getLogger().setLevel(args.loglevel)
 
         if getattr(args, 'path_patterns', None) is not None:
-            path_patterns = args.path_patterns.split(',')
+            path_patterns = _split_patterns(args.path_patterns)
 
             scancfg = ScanConfig(
                 path_patterns,
@@ -1388,96 +2158,25 @@ def main(*argv):
             if not args.skip_path_patterns:
                 skip_path_patterns = []
             else:
-                skip_path_patterns = args.skip_path_patterns.split(',')
+                skip_path_patterns = _split_patterns(args.skip_path_patterns)
 
             scancfg = ScanConfig(
                 scancfg.path_patterns,
                 skip_path_patterns,
                 scancfg.skip_data_patterns)
 
-        logging.debug(
-            'PATH_PATTERNS: {}'.format(
-                ', '.join(repr(p) for p in scancfg.path_patterns)))
-        logging.debug(
-            'SKIP_PATH_PATTERNS: {}'.format(
-                ', '.join(repr(p) for p in scancfg.skip_path_patterns)))
-        logging.debug(
-            'SKIP_DATA_PATTERNS: {}'.format(
-                ', '.join(repr(p) for p in scancfg.skip_data_patterns)))
-
-        if getattr(args, 'clang_format', None) not in (None, False, 'False'):
-            clang_format = args.clang_format
-            if clang_format is True:
-                clang_format = DEFAULT_CLANG_FORMAT
-
-            completed_process = subprocess.run(
-                [clang_format, '--version'], check=True,
-                stdout=subprocess.PIPE)
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
             logging.debug(
-                completed_process.stdout.decode(sys.getdefaultencoding()))
-        else:
-            clang_format = False
-
-        if args.command == 'check':
-            tool = CheckTool(
-                check_tabs=args.check_tabs,
-                check_eol=args.check_eol,
-                check_trailing=args.check_trailing,
-                check_encoding=args.check_encoding,
-                check_eol_at_eof=args.check_eol_at_eof,
-                check_relative_include=args.check_relative_include,
-                check_copyright=args.check_copyright,
-                check_mode=args.check_mode,
-                clang_format=clang_format,
-                maxlinelen=args.maxlinelen,
-                failfast=args.failfast,
-                scancfg=scancfg,
-            )
-
-            stats = collections.Counter()
-            for path in args.paths:
-                partial_stats = tool.scan(path)
-                stats.update(partial_stats)
+                'PATH_PATTERNS: %s',
+                ', '.join(repr(p) for p in scancfg.path_patterns))
+            logging.debug(
+                'SKIP_PATH_PATTERNS: %s',
+                ', '.join(repr(p) for p in scancfg.skip_path_patterns))
+            logging.debug(
+                'SKIP_DATA_PATTERNS: %s',
+                ', '.join(repr(p) for p in scancfg.skip_data_patterns))
 
-            if stats:
-                msg = '\n'.join(
-                    '{:7d}: {}'.format(v, k) for k, v in stats.items())
-                logging.warning('check failed\n' + msg)
-            else:
-                logging.info('check completed successfully')
-
-            return bool(stats)
-        elif args.command == 'fix':
-            tool = FixTool(
-                tabsize=args.tabsize,
-                fix_trailing=args.fix_trailing,
-                fix_eof=args.fix_eof,
-                fix_mode=args.fix_mode,
-                clang_format=clang_format,
-                eol=args.eol,
-                backup_ext=args.backup,
-                scancfg=scancfg,
-            )
-            for path in args.paths:
-                tool.scan(path)
-        elif args.command == 'update-copyright':
-            tool = CopyrightTool(
-                copyright_template_path=args.copyright_template_path,
-                update=args.update,
-                year=args.year,
-                backup_ext=args.backup,
-                scancfg=scancfg,
-            )
-            for path in args.paths:
-                tool.scan(path)
-        elif args.command == 'dumpcfg':
-            cfg = ConfigParser()
-            cfg.setup_default_config()
-            out = io.StringIO()
-            cfg.write(out)
-            print(out.getvalue())
-        else:
-            raise ValueError('invalid command: {!r}'.format(args.command))
+        ret = _COMMANDS[args.command](args, scancfg) or EX_OK
 
     except Exception as exc:
         logging.critical(
@@ -32,6 +32,22 @@ else:
     del enum
 
 
+try:
+    import concurrent.futures
+except ImportError:
+    install_requires.append('futures')
+else:
+    del concurrent
+
+
+try:
+    from functools import lru_cache
+except ImportError:
+    install_requires.append('backports.functools_lru_cache')
+else:
+    del lru_cache
+
+
 setup(
     name='fmtcheck',
     version=get_version(),
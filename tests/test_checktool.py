@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+
+import gc
+import os
+import sys
+import mmap
+import shutil
+import logging
+import tempfile
+import unittest
+
+import fmtcheck
+
+
+def setUpModule():
+    # normally done in fmtcheck.main
+    logging.addLevelName(logging.INFO - 1, 'VERBOSE')
+
+
+SOURCES = {
+    'clean.c': b'/* Copyright 2019 */\nint x;\n',
+    'tabs.c': b'/* Copyright 2019 */\nint main(void) {\n\treturn 0;\n}\n',
+    'crlf.c': b'/* Copyright 2019 */\r\nint x;\r\n',
+    'trailing.h': b'// Copyright 2019\nint x; \n',
+    'nonascii.c': u'// Copyright 2019\n// caf\xe9\n'.encode('utf-8'),
+    'noeol.c': b'// Copyright 2019\nint x;',
+    'nocopyright.c': b'int x;\n',
+    'sub/relinclude.c': b'// Copyright 2019\n#include "../x.h"\n',
+    'sub/long.c': b'// Copyright 2019\n' + b'x' * 100 + b'\n',
+}
+
+
+class CheckToolTestCase(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        for name, data in SOURCES.items():
+            filename = os.path.join(self.path, name)
+            if not os.path.isdir(os.path.dirname(filename)):
+                os.makedirs(os.path.dirname(filename))
+            with open(filename, 'wb') as fd:
+                fd.write(data)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def check_file(self, name, **kwargs):
+        tool = fmtcheck.CheckTool(eol=fmtcheck.Eol.UNIX, **kwargs)
+        return tool.check_file(os.path.join(self.path, name))
+
+    def test_clean(self):
+        assert not self.check_file('clean.c', maxlinelen=80)
+
+    def test_tabs(self):
+        assert list(self.check_file('tabs.c')) == ['tabs']
+
+    def test_invalid_eol(self):
+        assert list(self.check_file('crlf.c')) == ['invalid EOL']
+
+    def test_trailing(self):
+        assert list(self.check_file('trailing.h')) == ['trailing spaces']
+
+    def test_encoding(self):
+        assert list(self.check_file('nonascii.c')) == ['not ascii']
+        assert not self.check_file('nonascii.c', encoding='utf-8')
+        assert not self.check_file('clean.c', encoding='utf-8')
+
+    def test_is_ascii_compatible(self):
+        assert fmtcheck._is_ascii_compatible('utf-8')
+        assert fmtcheck._is_ascii_compatible('latin-1')
+        assert not fmtcheck._is_ascii_compatible('utf-16')
+
+    def test_eol_at_eof(self):
+        assert list(self.check_file('noeol.c')) == ['no eol at eof']
+
+    def test_copyright(self):
+        assert list(self.check_file('nocopyright.c')) == ['no copyright']
+
+    def test_relative_include(self):
+        stats = self.check_file(os.path.join('sub', 'relinclude.c'))
+        assert list(stats) == ['relative include']
+
+    def test_linelen(self):
+        name = os.path.join('sub', 'long.c')
+        assert not self.check_file(name)
+        assert list(self.check_file(name, maxlinelen=80)) == ['line tool long']
+
+    def test_linelen_non_utf8(self):
+        filename = os.path.join(self.path, 'latin1.c')
+        with open(filename, 'wb') as fd:
+            fd.write(b'// Copyright 2019\n// caf\xe9' + b'x' * 100 + b'\n')
+        logger = logging.getLogger()
+        level, handlers = logger.level, logger.handlers
+        logger.handlers = [logging.NullHandler()]  # discard messages
+        try:
+            for loglevel in (logging.WARNING, logging.INFO - 1):
+                logger.setLevel(loglevel)
+                stats = self.check_file(
+                    'latin1.c', maxlinelen=80, encoding='latin-1')
+                assert list(stats) == ['line tool long']
+        finally:
+            logger.setLevel(level)
+            logger.handlers = handlers
+
+    def test_scan(self):
+        tool = fmtcheck.CheckTool(eol=fmtcheck.Eol.UNIX, check_mode=False)
+        stats = tool.scan(self.path)
+        assert sum(stats.values()) == len(SOURCES) - 2
+
+    def test_scan_paths(self):
+        tool = fmtcheck.CheckTool(eol=fmtcheck.Eol.UNIX, maxlinelen=80)
+        paths = [os.path.join(self.path, 'sub'), self.path]
+        stats = tool.scan_paths(paths)
+        assert stats == tool.scan(paths[0]) + tool.scan(paths[1])
+        tool.failfast = True
+        assert sum(tool.scan_paths(paths).values()) == 1
+
+    def test_parallel_scan(self):
+        tool = fmtcheck.CheckTool(eol=fmtcheck.Eol.UNIX, maxlinelen=80)
+        stats = tool.scan(self.path)
+        tool.jobs = 2
+        assert tool.scan(self.path) == stats
+        paths = [self.path, os.path.join(self.path, 'sub')]
+        assert tool.scan_paths(paths) == stats + tool.scan(paths[1])
+
+    def test_parallel_failfast(self):
+        for index in range(100):
+            filename = os.path.join(self.path, 'tabs{}.c'.format(index))
+            with open(filename, 'wb') as fd:
+                fd.write(SOURCES['tabs.c'])
+        unraisable = []
+        unraisablehook = getattr(sys, 'unraisablehook', None)
+        sys.unraisablehook = unraisable.append
+        try:
+            tool = fmtcheck.CheckTool(
+                eol=fmtcheck.Eol.UNIX, failfast=True, jobs=2)
+            assert sum(tool.scan(self.path).values()) == 1
+            gc.collect()
+        finally:
+            if unraisablehook is None:
+                del sys.unraisablehook
+            else:
+                sys.unraisablehook = unraisablehook
+        assert not unraisable
+
+    def test_mmap(self):
+        tool = fmtcheck.CheckTool(eol=fmtcheck.Eol.UNIX, maxlinelen=80)
+        names = sorted(SOURCES)
+        expected = [self.check_file(name, maxlinelen=80) for name in names]
+        stats = tool.scan(self.path)
+
+        mapped = []
+        read_bytes = fmtcheck._read_bytes
+        threshold = fmtcheck.MMAP_THRESHOLD
+
+        def _read_bytes(*args, **kwargs):
+            data = read_bytes(*args, **kwargs)
+            mapped.append(data)
+            return data
+
+        fmtcheck._read_bytes = _read_bytes
+        fmtcheck.MMAP_THRESHOLD = 1
+        try:
+            results = [self.check_file(name, maxlinelen=80) for name in names]
+            assert results == expected
+            assert tool.scan(self.path) == stats
+        finally:
+            fmtcheck._read_bytes = read_bytes
+            fmtcheck.MMAP_THRESHOLD = threshold
+
+        assert len(mapped) == 2 * len(SOURCES)
+        for data in mapped:
+            assert isinstance(data, mmap.mmap)
+            self.assertRaises(ValueError, len, data)  # closed
+
+    def test_flags_update(self):
+        tool = fmtcheck.CheckTool(eol=fmtcheck.Eol.UNIX)
+        filename = os.path.join(self.path, 'tabs.c')
+        assert list(tool.check_file(filename)) == ['tabs']
+        tool.check_tabs = False
+        assert not tool.check_file(filename)
+
+    def test_eol_at_eof_only(self):
+        flags = dict(
+            check_tabs=False, check_eol=False, check_trailing=False,
+            check_encoding=False, check_relative_include=False,
+            check_copyright=False, check_mode=False)
+        assert not self.check_file('clean.c', **flags)
+        assert list(self.check_file('noeol.c', **flags)) == ['no eol at eof']
+
+        filename = os.path.join(self.path, 'blanks.c')
+        for tail in (b'\n', b'x'):
+            with open(filename, 'wb') as fd:
+                fd.write(b'int x;' + tail + b' ' * 10000)
+            stats = self.check_file('blanks.c', **flags)
+            assert bool(stats) == (tail == b'x')
+
+    def test_encoding_error(self):
+        filename = os.path.join(self.path, 'latin1.c')
+        with open(filename, 'wb') as fd:
+            fd.write(u'// Copyright 2019\n// caf\xe9\n'.encode('latin-1'))
+        stats = self.check_file('latin1.c', encoding='utf-8')
+        assert list(stats) == ['not utf-8']
+        assert not self.check_file('latin1.c', encoding='latin-1')
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import fmtcheck
+
+
+SOURCES = {
+    'single.c': (
+        b'/* Copyright 2017 */\nint x;\n',
+        b'/* Copyright 2017-2020 */\nint x;\n',
+    ),
+    'range.c': (
+        b'// Copyright (c) 2017-2019 A. Author\nint x;\n',
+        b'// Copyright (c) 2017-2020 A. Author\nint x;\n',
+    ),
+    'current.h': (
+        b'/* Copyright 2020 */\nint x;\n',
+        b'/* Copyright 2020 */\nint x;\n',
+    ),
+    'nocopyright.c': (
+        b'int x;\n',
+        b'/* Copyright 2020 */\nint x;\n',
+    ),
+}
+
+
+class CopyrightToolTestCase(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.srcpath = os.path.join(self.path, 'src')
+        os.mkdir(self.srcpath)
+        for name, (data, _) in SOURCES.items():
+            with open(os.path.join(self.srcpath, name), 'wb') as fd:
+                fd.write(data)
+
+        self.template_path = os.path.join(self.path, 'template.txt')
+        with open(self.template_path, 'w') as fd:
+            fd.write('/* Copyright {year} */\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def read(self, name):
+        with open(os.path.join(self.srcpath, name), 'rb') as fd:
+            return fd.read()
+
+    def test_update(self):
+        tool = fmtcheck.CopyrightTool(year=2020)
+        tool.scan(self.srcpath)
+        for name, (data, expected) in SOURCES.items():
+            if name == 'nocopyright.c':
+                expected = data
+            assert self.read(name) == expected, name
+
+    def test_template(self):
+        tool = fmtcheck.CopyrightTool(
+            copyright_template_path=self.template_path, year=2020)
+        tool.scan(self.srcpath)
+        for name, (_, expected) in SOURCES.items():
+            assert self.read(name) == expected, name
+
+    def test_template_no_update(self):
+        tool = fmtcheck.CopyrightTool(
+            copyright_template_path=self.template_path, update=False,
+            year=2020)
+        tool.scan(self.srcpath)
+        for name, (data, expected) in SOURCES.items():
+            if name != 'nocopyright.c':
+                expected = data
+            assert self.read(name) == expected, name
@@ -32,6 +32,8 @@ class SimpleDirEntryTestCase(unittest.TestCase):
 
     def test_stat(self):
         assert self.direntry.stat() == os.stat(__file__)
+        assert self.direntry.stat(follow_symlinks=False) == os.lstat(__file__)
+        assert self.direntry.stat() is self.direntry.stat()  # cached
 
     @unittest.skipIf(not hasattr(os, 'fspath'), 'os.fspath not available')
     def test_fspath(self):
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+import fmtcheck
+
+
+@unittest.skipIf(sys.version_info < (3,), 'open(..., newline) not available')
+class FixToolTestCase(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def fix(self, data, eol=fmtcheck.Eol.UNIX, **kwargs):
+        filename = os.path.join(self.path, 'src.c')
+        with open(filename, 'wb') as fd:
+            fd.write(data)
+        tool = fmtcheck.FixTool(eol=eol, **kwargs)
+        tool.scan(self.path)
+        with open(filename, 'rb') as fd:
+            return fd.read()
+
+    def test_trailing_spaces(self):
+        data = self.fix(b'int x;  \nint y; \n\nint z;\n')
+        assert data == b'int x;\nint y;\n\nint z;\n'
+
+    def test_trailing_tabs(self):
+        data = self.fix(b'int x;\t\nint y; \t \n')
+        assert data == b'int x;\nint y;\n'
+
+    def test_tabs(self):
+        data = self.fix(b'{\n\treturn;\n}\n', tabsize=2)
+        assert data == b'{\n  return;\n}\n'
+
+    def test_no_eol_at_eof(self):
+        data = self.fix(b'int x;\nint y;  ')
+        assert data == b'int x;\nint y;\n'
+        data = self.fix(b'int x;\n\n \n\t\n')
+        assert data == b'int x;\n'
+
+    def test_no_eol_at_eof_disabled(self):
+        data = self.fix(b'int x; \nint y;', fix_eof=False)
+        assert data == b'int x;\nint y;'
+
+    def test_lf(self):
+        data = self.fix(b'int x; \r\n\tint y;\r\n')
+        assert data == b'int x;\n    int y;\n'
+
+    def test_crlf(self):
+        src = b'int x; \n\tint y;\t\r\nint z;'
+        data = self.fix(src, eol=fmtcheck.Eol.WIN)
+        assert data == b'int x;\r\n    int y;\r\nint z;\r\n'
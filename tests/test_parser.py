@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+
+import io
+import logging
+import argparse
+import unittest
+import contextlib
+
+import fmtcheck
+
+
+def setUpModule():
+    # normally done in fmtcheck.main
+    logging.addLevelName(logging.INFO - 1, 'VERBOSE')
+
+
+class ParseArgsTestCase(unittest.TestCase):
+    def test_command(self):
+        for command in fmtcheck._SUBPARSER_BUILDERS:
+            argv = [command] if command == 'dumpcfg' else [command, '.']
+            args = fmtcheck.parse_args(argv)
+            assert args.command == command
+
+    def test_get_command(self):
+        assert fmtcheck._get_command(['fix', '.']) == 'fix'
+        assert fmtcheck._get_command(['--help']) is None
+        assert fmtcheck._get_command([]) is None
+
+    @unittest.skipIf(not hasattr(contextlib, 'redirect_stderr'),
+                     'contextlib.redirect_stderr not available')
+    def test_single_subparser(self):
+        parser = fmtcheck.get_parser('check')
+        with contextlib.redirect_stderr(io.StringIO()):
+            with self.assertRaises(SystemExit):
+                parser.parse_args(['fix', '.'])
+        assert parser.parse_args(['check', '.']).paths == ['.']
+
+    def test_jobs(self):
+        assert fmtcheck.parse_args(['check', '.']).jobs == 1
+        assert fmtcheck.parse_args(['check', '-j', '4', '.']).jobs == 4
+        assert fmtcheck.parse_args(['check', '-j', '0', '.']).jobs == 0
+        for value in ('-1', 'x'):
+            with self.assertRaises(argparse.ArgumentTypeError):
+                fmtcheck._non_negative_int(value)
+
+    def test_namespace(self):
+        namespace = argparse.Namespace(jobs=2, maxlinelen=80)
+        args = fmtcheck.parse_args(['check', '-j', '3', '.'], namespace)
+        assert args.command == 'check'
+        assert (args.jobs, args.maxlinelen) == (3, 80)
+
+    def test_split_patterns(self):
+        patterns = fmtcheck._split_patterns('*.c,*.h,*.c,Makefile,*.h')
+        assert patterns == ['*.c', '*.h', 'Makefile']
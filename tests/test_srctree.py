@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+
+import os
+import re
+import pickle
+import shutil
+import fnmatch
+import tempfile
+import unittest
+
+import fmtcheck
+
+
+class GetNameMatcherTestCase(unittest.TestCase):
+    PATTERNS = [
+        '*.[ch]', '*.[ch]pp', '*.txt', '.*', 'Makefile', 'CMake*', '*',
+        '[!a]*', '*.[a-c]', 'x[]]y*', 'a?b*', '[ab]*[cd]',
+    ]
+    NAMES = [
+        '', '.', '.git', 'a.c', 'a.h', 'a.cpp', 'x.txt', 'Makefile', 'b',
+        'x]y', 'a_b', 'ac', 'bd', 'CMakeLists.txt', 'x.C', 'a.hxx',
+    ]
+
+    def test_equivalence(self):
+        for pattern in self.PATTERNS:
+            matcher = fmtcheck._get_name_matcher((pattern,))
+            regex = re.compile(fnmatch.translate(pattern))
+            for name in self.NAMES:
+                assert bool(matcher(name)) == bool(regex.match(name)), (
+                    pattern, name)
+
+    def test_literal_names(self):
+        matcher = fmtcheck._get_name_matcher(('Makefile', 'setup.[ch]'))
+        cells = [cell.cell_contents for cell in matcher.__closure__]
+        closure = dict(zip(matcher.__code__.co_freevars, cells))
+        assert closure['match'] is None  # no regex
+        assert matcher('Makefile') and matcher('setup.c')
+        assert not matcher('setup.py')
+
+    def test_glob_literals(self):
+        assert fmtcheck._glob_literals('.[ch]pp') == ['.cpp', '.hpp']
+        assert fmtcheck._glob_literals('.[!c]') is None
+        assert fmtcheck._glob_literals('.c*') is None
+
+
+class GetDataSearchTestCase(unittest.TestCase):
+    def test_literal(self):
+        search = fmtcheck._get_data_search((b'DO NOT EDIT', b'generated'))
+        assert search(b'/* automatically generated */')
+        assert not search(b'int x;')
+
+    def test_regex(self):
+        search = fmtcheck._get_data_search(('^#!', 'generated'))
+        assert search('#!/bin/sh')
+        assert search('# generated')
+        assert not search('echo "#!"')
+
+
+class SrcTreeTestCase(unittest.TestCase):
+    FILES = [
+        'a.c',
+        'b.txt',
+        'c.py',
+        '.hidden.c',
+        '.git/d.c',
+        'sub/e.h',
+        'sub/deep/f.c',
+    ]
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        for name in self.FILES:
+            filename = os.path.join(self.path, name)
+            if not os.path.isdir(os.path.dirname(filename)):
+                os.makedirs(os.path.dirname(filename))
+            with open(filename, 'w') as fd:
+                fd.write(name + '\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def relpaths(self, srctree):
+        return sorted(
+            os.path.relpath(entry.path, self.path) for entry, _ in srctree)
+
+    def test_iter(self):
+        srctree = fmtcheck.SrcTree(self.path)
+        expected = ['a.c', 'b.txt', 'sub/deep/f.c', 'sub/e.h']
+        expected = [os.path.normpath(p) for p in expected]
+        assert self.relpaths(srctree) == expected
+
+    def test_data(self):
+        for entry, data in fmtcheck.SrcTree(self.path):
+            assert data == os.path.relpath(entry.path, self.path).replace(
+                os.sep, '/') + '\n'
+
+    def test_skip_path_patterns(self):
+        srctree = fmtcheck.SrcTree(
+            self.path, path_patterns=['*.c'],
+            skip_path_patterns=['.*', 'deep'])
+        assert self.relpaths(srctree) == ['a.c']
+
+    def test_skip_data_patterns(self):
+        srctree = fmtcheck.SrcTree(self.path, skip_data_patterns=['^sub/'])
+        assert self.relpaths(srctree) == ['a.c', 'b.txt']
+
+    def test_skip_data_literal_patterns(self):
+        srctree = fmtcheck.SrcTree(
+            self.path, mode=fmtcheck.Mode.BINARY,
+            skip_data_patterns=['sub/', 'b.txt'])
+        assert self.relpaths(srctree) == ['a.c']
+
+    def test_single_file(self):
+        filename = os.path.join(self.path, 'a.c')
+        srctree = fmtcheck.SrcTree(filename, mode=fmtcheck.Mode.BINARY)
+        assert [(entry.path, data) for entry, data in srctree] == [
+            (filename, b'a.c\n')]
+
+    def test_binary_data(self):
+        # the public iterator never returns memory mapped data
+        mmap_threshold = fmtcheck.MMAP_THRESHOLD
+        fmtcheck.MMAP_THRESHOLD = 1
+        try:
+            srctree = fmtcheck.SrcTree(self.path, mode=fmtcheck.Mode.BINARY)
+            items = list(srctree)
+        finally:
+            fmtcheck.MMAP_THRESHOLD = mmap_threshold
+        assert items
+        for entry, data in items:
+            assert isinstance(data, bytes)
+            name = os.path.relpath(entry.path, self.path).replace(os.sep, '/')
+            assert data == (name + '\n').encode('ascii')
+
+    @unittest.skipIf(not hasattr(os, 'symlink'), 'os.symlink not available')
+    def test_symlink_loop(self):
+        os.symlink(self.path, os.path.join(self.path, 'sub', 'loop'))
+        srctree = fmtcheck.SrcTree(self.path, path_patterns=['*.h'])
+        assert self.relpaths(srctree) == [os.path.join('sub', 'e.h')]
+
+    @unittest.skipIf(not hasattr(os, 'symlink'), 'os.symlink not available')
+    def test_symlink_dir(self):
+        other = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, other)
+        with open(os.path.join(other, 'g.h'), 'w') as fd:
+            fd.write('g.h\n')
+        os.symlink(other, os.path.join(self.path, 'link'))
+        os.symlink(other, os.path.join(self.path, 'sub', 'link'))
+        srctree = fmtcheck.SrcTree(self.path, path_patterns=['*.h'])
+        # the linked directory is scanned only once
+        names = [os.path.basename(p) for p in self.relpaths(srctree)]
+        assert sorted(names) == ['e.h', 'g.h']
+
+    @unittest.skipIf(not hasattr(os, 'mkfifo'), 'os.mkfifo not available')
+    def test_skip_non_regular_files(self):
+        os.mkfifo(os.path.join(self.path, 'fifo.c'))
+        srctree = fmtcheck.SrcTree(self.path, path_patterns=['*.c'])
+        expected = ['a.c', os.path.join('sub', 'deep', 'f.c')]
+        assert self.relpaths(srctree) == expected
+
+    def test_no_skip_patterns(self):
+        srctree = fmtcheck.SrcTree(
+            self.path, path_patterns=['*.c'], skip_path_patterns=[],
+            skip_data_patterns=[])
+        expected = ['.git/d.c', '.hidden.c', 'a.c', 'sub/deep/f.c']
+        expected = [os.path.normpath(p) for p in expected]
+        assert self.relpaths(srctree) == expected
+
+    def test_pickle(self):
+        srctree = fmtcheck.SrcTree(
+            self.path, path_patterns=['*.c', 'x?y'],
+            skip_data_patterns=['^sub/'])
+        clone = pickle.loads(pickle.dumps(srctree))
+        assert self.relpaths(clone) == self.relpaths(srctree)
+
+
+class PrunePathsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.path, 'sub', 'deep'))
+        os.makedirs(os.path.join(self.path, '.hidden'))
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_prune(self):
+        root = self.path
+        sub = os.path.join(root, 'sub')
+        deep = os.path.join(sub, 'deep')
+        hidden = os.path.join(root, '.hidden')
+        missing = os.path.join(root, 'missing')
+
+        prune = fmtcheck._prune_paths
+        assert prune([sub, deep]) == [sub]
+        assert prune([deep, root, sub]) == [root]
+        assert prune([sub, sub + os.sep, missing]) == [sub, missing]
+        assert prune([root, hidden]) == [root]
+        assert prune([root, hidden], ['.*']) == [root, hidden]
+        assert prune([root, deep], ['deep']) == [root, deep]
+        assert prune([root, deep], ['.*']) == [root]